@@ -2,10 +2,11 @@ from flask import Flask, request, redirect, render_template, jsonify, session, u
 import requests
 import base64
 import os
-from config import QB_CONFIG, supabase, User, DeleteCredits, STRIPE_PUBLIC_KEY
+from config import QB_CONFIG, supabase, User, DeleteCredits, STRIPE_PUBLIC_KEY, FREE_MONTHLY_CREDITS, CREDIT_RESET_JOB_INTERVAL_HOURS
 from stripe_utils import create_customer_portal_session, create_checkout_session, handle_successful_payment
+from credit_reset import start_credit_reset_timer
 import secrets
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
@@ -36,19 +37,37 @@ def make_session_permanent():
         print(f"Session contents: {dict(session)}")
         print(f"Request cookies: {request.cookies}")
 
+def initialize_user_credits(user_id: str):
+    """Give a new user their free credits, leaving an existing balance untouched.
+
+    Returns the inserted DeleteCredits, or None if the user already had a row.
+    Requires the unique constraint on delete_credits.user_id from schema.sql.
+    """
+    credits = DeleteCredits(user_id, FREE_MONTHLY_CREDITS, datetime.now(timezone.utc).isoformat())
+    result = supabase.table('delete_credits').upsert(
+        credits.to_dict(), on_conflict='user_id', ignore_duplicates=True
+    ).execute()
+    if result.data:
+        return DeleteCredits.from_dict(result.data[0])
+    return None
+
 def get_user_credits(user_id: str) -> DeleteCredits:
     """Get user's delete credits from the database."""
     credits_data = supabase.table('delete_credits').select('*').eq('user_id', user_id).execute()
-    if not credits_data.data:
-        # Initialize credits for new user
-        supabase.table('delete_credits').insert({
-            'user_id': user_id,
-            'credits': 20,
-            'last_reset': 'now()'
-        }).execute()
-        return DeleteCredits(user_id, 20, 'now()')
+    if credits_data.data:
+        return DeleteCredits.from_dict(credits_data.data[0])
+    credits = initialize_user_credits(user_id)
+    if credits:
+        return credits
+    # A concurrent request created the row first, so return its real balance
+    credits_data = supabase.table('delete_credits').select('*').eq('user_id', user_id).execute()
     return DeleteCredits.from_dict(credits_data.data[0])
 
+def use_delete_credits(user_id: str, amount: int) -> bool:
+    """Atomically subtract amount from the user's credits if they have enough."""
+    result = supabase.rpc('use_delete_credits', {'p_user_id': user_id, 'p_amount': amount}).execute()
+    return bool(result.data)
+
 def check_and_update_credits(user_id: str, amount: int) -> bool:
     """Check if user has enough credits and update them if they do."""
     # First check if user has an active subscription
@@ -61,18 +80,19 @@ def check_and_update_credits(user_id: str, amount: int) -> bool:
         print("User has active subscription, allowing delete")
         return True  # User has unlimited deletes
     
-    # If no subscription, check credits
+    # If no subscription, spend credits with one atomic UPDATE ... WHERE credits >= amount
+    # (use_delete_credits in schema.sql), so concurrent deletes and the monthly reset can't race it
+    if use_delete_credits(user_id, amount):
+        return True
+    
+    # No row matched: either the balance is too low or the user has no credits row yet
     credits = get_user_credits(user_id)
     if credits.credits < amount:
         print(f"User has insufficient credits: {credits.credits}")
         return False
     
-    # Update credits
-    supabase.table('delete_credits').update({
-        'credits': credits.credits - amount
-    }).eq('user_id', user_id).execute()
-    
-    return True
+    # The row was just created (or reset) since the first attempt, so spend from it
+    return use_delete_credits(user_id, amount)
 
 def refresh_access_token():
     current_refresh_token = session.get('refresh_token')
@@ -313,13 +333,7 @@ def callback():
         supabase.table('users').upsert(user_data).execute()
         
         # Initialize user's credits if they don't exist
-        credits_data = supabase.table('delete_credits').select('*').eq('user_id', received_realm_id).execute()
-        if not credits_data.data:
-            supabase.table('delete_credits').insert({
-                'user_id': received_realm_id,
-                'credits': 20,
-                'last_reset': 'now()'
-            }).execute()
+        initialize_user_credits(received_realm_id)
         
         # Store the user ID in the session
         session['user_id'] = received_realm_id
@@ -474,6 +488,9 @@ def qb_api():
 if __name__ == '__main__':
     # Read debug flag from environment variable, default to False
     debug_mode = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
+    # Start the credit reset job once (the debug reloader runs this block in two processes)
+    if CREDIT_RESET_JOB_INTERVAL_HOURS > 0 and (not debug_mode or os.getenv('WERKZEUG_RUN_MAIN') == 'true'):
+        start_credit_reset_timer(CREDIT_RESET_JOB_INTERVAL_HOURS)
     # Use 0.0.0.0 to allow external access and proper URL generation
     app.run(
         host='0.0.0.0',  # Required for proper external URL generation
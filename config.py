@@ -42,6 +42,12 @@ if not SUPABASE_KEY:
 # Application Base URL (for redirects, etc.)
 BASE_URL = os.getenv('BASE_URL', 'http://localhost:5001') # Default for local dev
 
+# Free Delete Credits Configuration
+FREE_MONTHLY_CREDITS = int(os.getenv('FREE_MONTHLY_CREDITS', '20'))
+CREDIT_RESET_INTERVAL_DAYS = int(os.getenv('CREDIT_RESET_INTERVAL_DAYS', '30'))
+# How often the in-process reset job runs; 0 disables it (use credit_reset.py from cron instead)
+CREDIT_RESET_JOB_INTERVAL_HOURS = float(os.getenv('CREDIT_RESET_JOB_INTERVAL_HOURS', '0'))
+
 # Initialize Supabase client
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from postgrest.types import ReturnMethod
+from config import supabase, FREE_MONTHLY_CREDITS, CREDIT_RESET_INTERVAL_DAYS
+
+def reset_due_credits(now: Optional[datetime] = None) -> int:
+    """Reset free credits for every account whose last reset is older than the reset interval.
+
+    Runs as a single UPDATE ... WHERE last_reset IS NULL OR last_reset < cutoff so the work
+    stays in the database regardless of how many accounts are due. Assumes last_reset is a
+    timestamptz column. now must be timezone-aware. Returns the number of accounts reset.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    elif now.tzinfo is None:
+        raise ValueError("reset_due_credits requires a timezone-aware datetime.")
+    now = now.astimezone(timezone.utc)
+    cutoff = now - timedelta(days=CREDIT_RESET_INTERVAL_DAYS)
+    # UTC 'Z' form keeps '+' and ',' out of the PostgREST or= filter
+    cutoff_filter = cutoff.strftime('%Y-%m-%dT%H:%M:%SZ')
+    started = time.monotonic()
+
+    error = None
+    accounts_reset = 0
+    try:
+        # Ask only for the row count so the reset rows aren't sent back over the wire
+        result = supabase.table('delete_credits').update({
+            'credits': FREE_MONTHLY_CREDITS,
+            'last_reset': now.isoformat()
+        }, count='exact', returning=ReturnMethod.minimal).or_(
+            f'last_reset.is.null,last_reset.lt.{cutoff_filter}'
+        ).execute()
+        accounts_reset = result.count or 0
+    except Exception as e:
+        error = e
+        print(f"Error resetting delete credits: {str(e)}")
+
+    duration_ms = round((time.monotonic() - started) * 1000, 1)
+    record_reset_run(now, accounts_reset, duration_ms, error)
+
+    if error:
+        raise error
+
+    print(f"Credit reset complete: {accounts_reset} accounts reset to {FREE_MONTHLY_CREDITS} "
+          f"credits (cutoff {cutoff_filter}) in {duration_ms}ms")
+    return accounts_reset
+
+def record_reset_run(run_at: datetime, accounts_reset: int, duration_ms: float, error: Optional[Exception] = None):
+    """Store one reset run in credit_reset_runs so cron and in-process runs share a durable record."""
+    try:
+        supabase.table('credit_reset_runs').insert({
+            'run_at': run_at.isoformat(),
+            'accounts_reset': accounts_reset,
+            'duration_ms': duration_ms,
+            'succeeded': error is None,
+            'error': str(error) if error else None
+        }, returning=ReturnMethod.minimal).execute()
+    except Exception as e:
+        # Losing a metrics row shouldn't fail the reset itself
+        print(f"Error recording credit reset run: {str(e)}")
+
+def start_credit_reset_timer(interval_hours: float, initial_delay_seconds: float = 60) -> threading.Timer:
+    """Run reset_due_credits shortly after startup and then every interval_hours on a daemon timer thread.
+
+    The first run is not a full interval away, so frequent restarts can't keep postponing it.
+    """
+    def run():
+        try:
+            reset_due_credits()
+        except Exception:
+            pass  # Already logged and recorded; try again on the next tick
+        start_credit_reset_timer(interval_hours, initial_delay_seconds=interval_hours * 3600)
+
+    timer = threading.Timer(initial_delay_seconds, run)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+def main():
+    """CLI entry point for running the reset from cron or a scheduler: python credit_reset.py"""
+    try:
+        reset_due_credits()
+    except Exception:
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
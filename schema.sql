@@ -0,0 +1,29 @@
+-- Database objects the app relies on. Apply in the Supabase SQL editor before deploying.
+
+-- initialize_user_credits() upserts with on_conflict='user_id'. Without this constraint
+-- PostgREST rejects the upsert and every OAuth /callback fails.
+ALTER TABLE delete_credits ADD CONSTRAINT delete_credits_user_id_key UNIQUE (user_id);
+
+-- One row per credit reset run (credit_reset.py), written by both the cron entry point
+-- and the in-process timer. Query it from the dashboard; it is not exposed by the app.
+CREATE TABLE IF NOT EXISTS credit_reset_runs (
+    id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    run_at timestamptz NOT NULL,
+    accounts_reset integer NOT NULL,
+    duration_ms double precision NOT NULL,
+    succeeded boolean NOT NULL,
+    error text
+);
+
+-- Atomic credit decrement for the delete path (check_and_update_credits). Returns the new
+-- balance, or no row when the user has no credits row or too few credits. Because the check
+-- and the write are one statement, it can't overwrite a concurrent delete or monthly reset.
+CREATE OR REPLACE FUNCTION use_delete_credits(p_user_id text, p_amount integer)
+RETURNS TABLE (remaining_credits integer)
+LANGUAGE sql
+AS $$
+    UPDATE delete_credits
+    SET credits = credits - p_amount
+    WHERE user_id = p_user_id AND credits >= p_amount
+    RETURNING credits;
+$$;